@@ -1,6 +1,6 @@
 {
     'name': 'OH Appraisal 9-Box Grid',
-    'version': '1.0',
+    'version': '1.1',
     'category': 'Human Resources/Appraisals',
     'summary': '9-Box Grid Assessment Framework',
     'description': """
@@ -22,8 +22,13 @@
     'data': [
         'security/ninebox_security.xml',  # Add security groups first
         'security/ir.model.access.csv',
+        'data/ninebox_data.xml',
         'views/ninebox_template_views.xml',
         'views/menu_views.xml',
+        'views/ninebox_objective_views.xml',
+        'views/ninebox_snapshot_views.xml',
+        'wizard/ninebox_simulation_views.xml',
+        'report/ninebox_movement_report_views.xml',
     ],
     'license': 'LGPL-3',
     'installable': True,
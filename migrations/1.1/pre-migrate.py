@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+
+
+def migrate(cr, version):
+    """Start existing templates' periods at their creation date.
+
+    Creating the column before the ORM does keeps it from filling every
+    existing template with the upgrade date as the field default.
+    """
+    cr.execute("ALTER TABLE oh_appraisal_ninebox_template ADD COLUMN IF NOT EXISTS period_start date")
+    cr.execute("""
+        UPDATE oh_appraisal_ninebox_template
+           SET period_start = create_date::date
+         WHERE period_start IS NULL
+    """)
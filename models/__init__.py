@@ -1 +1,3 @@
 from . import ninebox_template
+from . import ninebox_objective
+from . import ninebox_snapshot
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+import logging
+
+import psycopg2
+
+from odoo import api, fields, models, tools
+from odoo.tools.sql import escape_psql
+
+_logger = logging.getLogger(__name__)
+
+
+class OHAppraisalNineboxObjective(models.Model):
+    _name = 'oh.appraisal.ninebox.objective'
+    _description = '9-Box Objective Breakdown Search'
+    _auto = False
+    _order = 'template_id desc, axis, category, id'
+
+    axis = fields.Selection([
+        ('performance', 'Performance'),
+        ('potential', 'Potential')
+    ], string='Axis', readonly=True)
+    template_id = fields.Many2one('oh.appraisal.ninebox.template', string='Template', readonly=True)
+    department_id = fields.Many2one('hr.department', string='Department', readonly=True)
+    company_id = fields.Many2one('res.company', string='Company', readonly=True)
+    active = fields.Boolean('Active', readonly=True)
+    category = fields.Selection([
+        ('department', 'Department'),
+        ('role', 'Role'),
+        ('common', 'Common')
+    ], readonly=True)
+    objective_breakdown = fields.Char('Objective Breakdown', readonly=True)
+    priority = fields.Selection([
+        ('low', 'Low'),
+        ('medium', 'Medium'),
+        ('high', 'High')
+    ], readonly=True)
+    team_id = fields.Many2one('oh.appraisal.team', string='Team', readonly=True)
+    distributed_weightage = fields.Float('Distributed Weightage (%)', readonly=True)
+
+    def _select_lines(self, axis, table, parity):
+        return """
+            SELECT
+                line.id * 2 + %(parity)s AS id,
+                '%(axis)s' AS axis,
+                line.template_id,
+                template.department_id,
+                template.company_id,
+                template.active,
+                line.category,
+                line.objective_breakdown,
+                line.priority,
+                line.team_id,
+                line.distributed_weightage
+            FROM %(table)s line
+            JOIN oh_appraisal_ninebox_template template ON template.id = line.template_id
+        """ % {'axis': axis, 'table': table, 'parity': parity}
+
+    _line_tables = ['oh_appraisal_ninebox_performance_line', 'oh_appraisal_ninebox_potential_line']
+
+    def _has_trigram(self):
+        self.env.cr.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        return bool(self.env.cr.fetchone())
+
+    def _create_objective_indexes(self):
+        """Make sure objective_breakdown searches on the line tables are indexed.
+
+        The line fields ask Odoo for trigram indexes, which it silently builds
+        as plain btree indexes when pg_trgm was missing at registry load. Try to
+        install the extension and add the trigram index ourselves; when that is
+        not allowed, add a ``lower() text_pattern_ops`` index instead, which
+        serves the prefix searches done by search_templates() in that case.
+        """
+        cr = self.env.cr
+        if not self._has_trigram():
+            try:
+                with cr.savepoint(flush=False):
+                    cr.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            except psycopg2.Error:
+                _logger.warning(
+                    "pg_trgm cannot be installed: objective searches on %s fall back to "
+                    "indexed prefix matches. Run 'CREATE EXTENSION pg_trgm' and update "
+                    "the module to get substring searches.",
+                    self._name,
+                )
+        has_trigram = self._has_trigram()
+        for table in self._line_tables:
+            if has_trigram and self.env.registry.has_trigram:
+                # Odoo's own objective_breakdown index already is the trigram one
+                continue
+            if has_trigram:
+                cr.execute("""
+                    CREATE INDEX IF NOT EXISTS %s_objective_breakdown_trgm_index
+                        ON %s USING gin (objective_breakdown gin_trgm_ops)
+                """ % (table, table))
+            else:
+                cr.execute("""
+                    CREATE INDEX IF NOT EXISTS %s_objective_breakdown_prefix_index
+                        ON %s (lower(objective_breakdown) text_pattern_ops)
+                """ % (table, table))
+
+    def init(self):
+        # Filters on the view are pushed down into both branches of the UNION ALL,
+        # so searches use the objective_breakdown indexes of the line tables.
+        self._create_objective_indexes()
+        tools.drop_view_if_exists(self.env.cr, self._table)
+        self.env.cr.execute("""CREATE OR REPLACE VIEW %s AS (%s UNION ALL %s)""" % (
+            self._table,
+            self._select_lines('performance', self._line_tables[0], 0),
+            self._select_lines('potential', self._line_tables[1], 1),
+        ))
+
+    @api.model
+    def search_templates(self, term, include_archived=True, limit=None):
+        """Return the ids of the templates having an objective breakdown that contains ``term``.
+
+        Archived templates are included by default; pass ``include_archived=False``
+        to only search the active ones.
+
+        Without the pg_trgm extension a substring search cannot use an index, so
+        the search is reduced to objective breakdowns *starting with* ``term``
+        (case-insensitive), served by the ``lower() text_pattern_ops`` indexes.
+        """
+        if self._has_trigram():
+            groups = self.with_context(active_test=not include_archived)._read_group(
+                [('objective_breakdown', 'ilike', term)],
+                ['template_id'],
+                limit=limit,
+            )
+            return [template.id for template, in groups]
+
+        self.env['oh.appraisal.ninebox.performance.line'].flush_model(['objective_breakdown', 'template_id'])
+        self.env['oh.appraisal.ninebox.potential.line'].flush_model(['objective_breakdown', 'template_id'])
+        pattern = escape_psql(term.lower()) + '%'
+        self.env.cr.execute("""
+            SELECT DISTINCT template_id
+              FROM %s
+             WHERE lower(objective_breakdown) LIKE %%s
+        """ % self._table, (pattern,))
+        # Apply access rules and the archived filter through the ORM
+        templates = self.env['oh.appraisal.ninebox.template'].with_context(
+            active_test=not include_archived,
+        ).search([('id', 'in', [row[0] for row in self.env.cr.fetchall()])], order='id', limit=limit)
+        return templates.ids
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+import base64
+import json
+import zlib
+
+from odoo import api, fields, models
+
+
+class OHAppraisalNineboxSnapshot(models.Model):
+    _name = 'oh.appraisal.ninebox.snapshot'
+    _description = '9-Box Archived Template Snapshot'
+    _order = 'compacted_date desc, id desc'
+
+    name = fields.Char('Template Name', required=True, readonly=True)
+    template_id = fields.Many2one(
+        'oh.appraisal.ninebox.template',
+        string='Template',
+        required=True,
+        readonly=True,
+        index=True,
+        ondelete='cascade'
+    )
+    department_id = fields.Many2one(related='template_id.department_id')
+    company_id = fields.Many2one(related='template_id.company_id')
+    compacted_date = fields.Datetime('Compacted On', default=fields.Datetime.now, readonly=True)
+    weightage_count = fields.Integer('Weightage Rows', readonly=True)
+    line_count = fields.Integer('Criteria Lines', readonly=True)
+    message_count = fields.Integer('Messages', readonly=True)
+    activity_count = fields.Integer('Activities', readonly=True)
+    follower_count = fields.Integer('Followers', readonly=True)
+    payload = fields.Binary(
+        'Payload',
+        attachment=False,
+        readonly=True,
+        help="zlib compressed JSON of the weightage rows, criteria lines, messages, activities and followers of the template"
+    )
+    payload_size = fields.Integer('Payload Size (bytes)', readonly=True)
+
+    @api.model
+    def _prepare_snapshot_vals(self, template, payload):
+        data = zlib.compress(json.dumps(payload, default=str).encode(), 9)
+        return {
+            'name': template.name,
+            'template_id': template.id,
+            'weightage_count': len(payload['weightages']),
+            'line_count': len(payload['performance_lines']) + len(payload['potential_lines']),
+            'message_count': len(payload['messages']),
+            'activity_count': len(payload['activities']),
+            'follower_count': len(payload['followers']),
+            'payload': base64.b64encode(data),
+            'payload_size': len(data),
+        }
+
+    def _get_payload(self):
+        self.ensure_one()
+        return json.loads(zlib.decompress(base64.b64decode(self.payload)))
+
+    def action_restore(self):
+        """Recreate the live rows of the templates and drop their snapshots"""
+        for snapshot in self:
+            snapshot.template_id._restore_snapshot(snapshot._get_payload())
+        self.unlink()
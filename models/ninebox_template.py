@@ -1,6 +1,68 @@
 # -*- coding: utf-8 -*-
+import logging
+import random
+import time
+
+from psycopg2 import OperationalError, errorcodes
+
 from odoo import api, fields, models, _
-from odoo.exceptions import ValidationError
+from odoo.exceptions import UserError, ValidationError
+from odoo.tools import float_compare
+
+_logger = logging.getLogger(__name__)
+
+# First key of the two-key pg_advisory_xact_lock(), the second one is the template id
+NINEBOX_LOCK_NAMESPACE = 9009
+# Longest wait for a template lock before PostgreSQL raises LOCK_NOT_AVAILABLE
+NINEBOX_LOCK_TIMEOUT = '10s'
+NINEBOX_LOCK_RETRIES = 5
+NINEBOX_LOCK_BACKOFF = 0.1
+# Errors that go away when the unit of work is retried in a new transaction
+NINEBOX_LOCK_RETRY_PGCODES = (
+    errorcodes.SERIALIZATION_FAILURE,
+    errorcodes.LOCK_NOT_AVAILABLE,
+    errorcodes.DEADLOCK_DETECTED,
+)
+
+# Archived templates compacted per run of the retention cron
+NINEBOX_COMPACT_BATCH = 100
+NINEBOX_WEIGHTAGE_SNAPSHOT_FIELDS = ['sequence', 'team_id', 'type', 'department_weightage', 'role_weightage']
+NINEBOX_LINE_SNAPSHOT_FIELDS = [
+    'sequence', 'category', 'objective_breakdown', 'priority', 'team_id',
+    'metric', 'actual_value', 'target_value', 'distributed_weightage',
+]
+NINEBOX_MESSAGE_SNAPSHOT_FIELDS = [
+    'date', 'author_id', 'body', 'subject', 'email_from', 'message_type', 'subtype_id',
+    'parent_id', 'partner_ids', 'attachment_ids',
+]
+NINEBOX_ACTIVITY_SNAPSHOT_FIELDS = ['activity_type_id', 'summary', 'note', 'date_deadline', 'user_id']
+NINEBOX_FOLLOWER_SNAPSHOT_FIELDS = ['partner_id', 'subtype_ids']
+NINEBOX_TRACKING_SNAPSHOT_FIELDS = [
+    'field_id', 'currency_id',
+    'old_value_char', 'new_value_char', 'old_value_integer', 'new_value_integer',
+    'old_value_float', 'new_value_float', 'old_value_datetime', 'new_value_datetime',
+]
+
+# Relative share of the available weightage given to a criteria line by priority
+NINEBOX_PRIORITY_WEIGHTS = {'low': 1, 'medium': 2, 'high': 3}
+
+
+def _split_by_weights(amount, weights):
+    """Split an integer ``amount`` proportionally to ``weights`` with an exact sum.
+
+    Largest remainder method: every share is floored, then the units left over
+    go to the shares with the largest remainders, earliest first on ties.
+    """
+    total = sum(weights)
+    if not total or amount <= 0:
+        return [0] * len(weights)
+    shares = [amount * weight // total for weight in weights]
+    remainders = [amount * weight % total for weight in weights]
+    leftover = amount - sum(shares)
+    for index in sorted(range(len(weights)), key=lambda i: -remainders[i])[:leftover]:
+        shares[index] += 1
+    return shares
+
 
 class OHAppraisalNineboxTemplate(models.Model):
     _name = 'oh.appraisal.ninebox.template'
@@ -28,6 +90,14 @@ class OHAppraisalNineboxTemplate(models.Model):
         help="Select department to automatically load weightage configuration"
     )
     active = fields.Boolean('Active', default=True)
+    period_start = fields.Date(
+        'Period Start',
+        required=True,
+        default=fields.Date.context_today,
+        index=True,
+        tracking=True,
+        help="Start of the appraisal cycle assessed with this template, used to order the cycles of a department"
+    )
     company_id = fields.Many2one('res.company', default=lambda self: self.env.company)
 
     # Weightage Distribution
@@ -220,6 +290,96 @@ class OHAppraisalNineboxTemplate(models.Model):
             record.potential_allocated_role = sum(record.potential_weightage_ids.mapped('role_weightage'))
             record.potential_allocated_common = sum(record.potential_weightage_ids.mapped('common_weightage'))
 
+    def _lock_templates(self):
+        """Hold the advisory locks of these templates until the end of the transaction.
+
+        Locks are taken in id order so overlapping callers cannot deadlock, and
+        only the given templates are locked, so edits to other templates never
+        wait on each other.
+        """
+        template_ids = sorted({template_id for template_id in self.ids if isinstance(template_id, int)})
+        if not template_ids:
+            return
+        cr = self.env.cr
+        cr.execute("SELECT current_setting('lock_timeout')")
+        lock_timeout = cr.fetchone()[0]
+        cr.execute("SELECT set_config('lock_timeout', %s, true)", (NINEBOX_LOCK_TIMEOUT,))
+        for template_id in template_ids:
+            cr.execute("SELECT pg_advisory_xact_lock(%s, %s)", (NINEBOX_LOCK_NAMESPACE, template_id))
+        cr.execute("SELECT set_config('lock_timeout', %s, true)", (lock_timeout,))
+
+    def _try_lock_templates(self):
+        """Take the advisory locks of these templates without waiting.
+
+        :return: False if another transaction holds one of them
+        """
+        cr = self.env.cr
+        for template_id in sorted(set(self.ids)):
+            cr.execute("SELECT pg_try_advisory_xact_lock(%s, %s)", (NINEBOX_LOCK_NAMESPACE, template_id))
+            if not cr.fetchone()[0]:
+                return False
+        return True
+
+    def _holds_template_locks(self):
+        """Whether the current transaction already holds a lock on one of these templates"""
+        self.env.cr.execute("""
+            SELECT 1
+              FROM pg_locks
+             WHERE locktype = 'advisory'
+               AND pid = pg_backend_pid()
+               AND classid = %s::oid
+               AND objid = ANY(%s::oid[])
+               AND objsubid = 2
+             LIMIT 1
+        """, (NINEBOX_LOCK_NAMESPACE, list(self.ids)))
+        return bool(self.env.cr.fetchone())
+
+    def _run_with_template_lock(self, method, *args, **kwargs):
+        """Call ``method`` on these templates in its own transaction, under their locks.
+
+        The locks are taken without waiting by the first statement of a fresh
+        cursor. When they are granted, no other holder was running when the
+        REPEATABLE READ snapshot was taken, so the work cannot conflict with a
+        concurrent sync or edit of the same templates. When they are busy, or
+        the work still fails with a serialization failure, lock timeout or
+        deadlock (e.g. against a writer that does not lock), the transaction is
+        rolled back and the whole unit of work is retried with jittered
+        exponential backoff, sleeping outside of any transaction.
+
+        When the current transaction already holds one of these locks, it has
+        written to the templates or their rows: a second cursor could never get
+        the lock (nor see those writes), so ``method`` runs inline instead.
+        """
+        if self._holds_template_locks():
+            self._lock_templates()
+            return getattr(self, method)(*args, **kwargs)
+        for attempt in range(1, NINEBOX_LOCK_RETRIES + 1):
+            reason = None
+            try:
+                with self.env.registry.cursor() as cr:
+                    records = self.with_env(self.env(cr=cr))
+                    if records._try_lock_templates():
+                        result = getattr(records, method)(*args, **kwargs)
+                        records.env.flush_all()
+                    else:
+                        reason = 'lock busy'
+                        cr.rollback()
+            except OperationalError as e:
+                if e.pgcode not in NINEBOX_LOCK_RETRY_PGCODES:
+                    raise
+                reason = e.pgcode
+            if reason is None:
+                # The work was committed by another cursor
+                self.env.invalidate_all()
+                return result
+            if attempt == NINEBOX_LOCK_RETRIES:
+                break
+            delay = random.uniform(0.0, NINEBOX_LOCK_BACKOFF * 2 ** attempt)
+            _logger.info("%s on templates %s, retrying %s in %.2fs (attempt %d/%d)",
+                         reason, self.ids, method, delay, attempt, NINEBOX_LOCK_RETRIES)
+            time.sleep(delay)
+        raise UserError(_('These templates are being updated by another user, please try again in a moment.'))
+
     def _ensure_common_weightage_distribution(self):
         """Trigger recomputation of common weightage"""
         self.mapped('performance_weightage_ids')._compute_common_weightage()
@@ -290,6 +450,29 @@ class OHAppraisalNineboxTemplate(models.Model):
                 record.common_weightage = 0.0
 
     is_synced = fields.Boolean('Is Synced', default=False)
+    is_compacted = fields.Boolean(
+        'Is Compacted',
+        default=False,
+        copy=False,
+        readonly=True,
+        help="Weightage rows, criteria lines and chatter of this archived template are stored in a snapshot"
+    )
+    snapshot_ids = fields.One2many('oh.appraisal.ninebox.snapshot', 'template_id', string='Snapshots')
+    archived_date = fields.Datetime(
+        'Archived On',
+        copy=False,
+        readonly=True,
+        index=True,
+        help="When the template was archived, used by the retention job to compact old templates"
+    )
+
+    def init(self):
+        # Templates archived before archived_date existed age from their last write
+        self.env.cr.execute("""
+            UPDATE oh_appraisal_ninebox_template
+               SET archived_date = write_date
+             WHERE active IS NOT TRUE AND archived_date IS NULL
+        """)
 
     @api.onchange('department_id', 'industry_type')
     def _onchange_department_id(self):
@@ -302,7 +485,9 @@ class OHAppraisalNineboxTemplate(models.Model):
         self.ensure_one()
         if not self.department_id or not self.selected_okr_template_id:
             return
+        return self._run_with_template_lock('_sync_key_results')
 
+    def _sync_key_results(self):
         okr_template = self.selected_okr_template_id
 
         # Clear existing records
@@ -317,66 +502,40 @@ class OHAppraisalNineboxTemplate(models.Model):
         self.common_weightage = okr_template.department_budget_common
 
         # 2. Sync weightage distribution from OKR template's weightage table
-        existing_teams = {}
+        weightage_vals_list = []
         for okr_weightage in okr_template.weightage_ids:
-            weightage_vals = {
+            weightage_vals_list.append({
                 'template_id': self.id,
                 'team_id': okr_weightage.team_id.id,
                 'type': 'performance',
                 'department_weightage': okr_weightage.department_weightage,
                 'role_weightage': okr_weightage.role_weightage,
-            }
-            weightage = self.env['oh.appraisal.ninebox.weightage'].create(weightage_vals)
-            existing_teams[okr_weightage.team_id.id] = weightage
-
-        # 3. Sync key results with exact values
-        # Department key results
-        for kr in okr_template.department_key_result_ids:
-            if kr.team_id.id in existing_teams:
-                self.env['oh.appraisal.ninebox.performance.line'].create({
-                    'template_id': self.id,
-                    'category': 'department',
-                    'objective_breakdown': kr.key_objective_breakdown.objective_item,
-                    'priority': kr.breakdown_priority,
-                    'team_id': kr.team_id.id,
-                    'metric': kr.metric,
-                    'actual_value': kr.actual_value,
-                    'target_value': kr.target_value,
-                    # 'achieve': '',
-                    'distributed_weightage': kr.distributed_weightage,
-                })
-
-        # Role key results 
-        for kr in okr_template.role_key_result_ids:
-            if kr.team_id.id in existing_teams:
-                self.env['oh.appraisal.ninebox.performance.line'].create({
-                    'template_id': self.id,
-                    'category': 'role',
-                    'objective_breakdown': kr.key_objective_breakdown.objective_item,
-                    'priority': kr.breakdown_priority,
-                    'team_id': kr.team_id.id,
-                    'metric': kr.metric,
-                    'actual_value': kr.actual_value,
-                    'target_value': kr.target_value,
-                    # 'achieve': '',
-                    'distributed_weightage': kr.distributed_weightage,
-                })
-
-        # Common key results
-        for kr in okr_template.common_key_result_ids:
-            if kr.team_id.id in existing_teams:
-                self.env['oh.appraisal.ninebox.performance.line'].create({
-                    'template_id': self.id,
-                    'category': 'common',
-                    'objective_breakdown': kr.key_objective_breakdown.objective_item,
-                    'priority': kr.breakdown_priority,
-                    'team_id': kr.team_id.id,
-                    'metric': kr.metric,
-                    'actual_value': kr.actual_value,
-                    'target_value': kr.target_value,
-                    # 'achieve': '',
-                    'distributed_weightage': kr.distributed_weightage,
-                })
+            })
+        weightages = self.env['oh.appraisal.ninebox.weightage'].create(weightage_vals_list)
+        existing_teams = set(weightages.team_id.ids)
+
+        # 3. Sync key results with exact values, created in a single batch
+        line_vals_list = []
+        for category, key_results in [
+            ('department', okr_template.department_key_result_ids),
+            ('role', okr_template.role_key_result_ids),
+            ('common', okr_template.common_key_result_ids),
+        ]:
+            for kr in key_results:
+                if kr.team_id.id in existing_teams:
+                    line_vals_list.append({
+                        'template_id': self.id,
+                        'category': category,
+                        'objective_breakdown': kr.key_objective_breakdown.objective_item,
+                        'priority': kr.breakdown_priority,
+                        'team_id': kr.team_id.id,
+                        'metric': kr.metric,
+                        'actual_value': kr.actual_value,
+                        'target_value': kr.target_value,
+                        # 'achieve': '',
+                        'distributed_weightage': kr.distributed_weightage,
+                    })
+        self.env['oh.appraisal.ninebox.performance.line'].create(line_vals_list)
 
         # Update computed fields and status
         self.is_synced = True
@@ -414,7 +573,9 @@ class OHAppraisalNineboxTemplate(models.Model):
     def action_unsync_key_results(self):
         """Unsync Key Results and clear performance tables"""
         self.ensure_one()
-        
+        return self._run_with_template_lock('_unsync_key_results')
+
+    def _unsync_key_results(self):
         message = ''
         if self.performance_dept_line_ids or self.performance_role_line_ids or self.performance_common_line_ids:
             # Clear all performance lines
@@ -488,11 +649,11 @@ class OHAppraisalNineboxTemplate(models.Model):
             total_role = sum(record.performance_role_line_ids.mapped('distributed_weightage'))
             total_common = sum(record.performance_common_line_ids.mapped('distributed_weightage'))
 
-            if total_dept > record.performance_dept_available:
+            if float_compare(total_dept, record.performance_dept_available, precision_digits=2) > 0:
                 raise ValidationError(_('Total department weightage (%.2f%%) cannot exceed available weightage (%.2f%%)') % (total_dept, record.performance_dept_available))
-            if total_role > record.performance_role_available:
+            if float_compare(total_role, record.performance_role_available, precision_digits=2) > 0:
                 raise ValidationError(_('Total role weightage (%.2f%%) cannot exceed available weightage (%.2f%%)') % (total_role, record.performance_role_available))
-            if total_common > record.performance_common_available:
+            if float_compare(total_common, record.performance_common_available, precision_digits=2) > 0:
                 raise ValidationError(_('Total common weightage (%.2f%%) cannot exceed available weightage (%.2f%%)') % (total_common, record.performance_common_available))
 
     @api.depends('potential_dept_line_ids.distributed_weightage',
@@ -511,29 +672,44 @@ class OHAppraisalNineboxTemplate(models.Model):
             total_role = sum(record.potential_role_line_ids.mapped('distributed_weightage'))
             total_common = sum(record.potential_common_line_ids.mapped('distributed_weightage'))
 
-            if total_dept > record.potential_dept_available:
+            if float_compare(total_dept, record.potential_dept_available, precision_digits=2) > 0:
                 raise ValidationError(_('Total department weightage (%.2f%%) cannot exceed available weightage (%.2f%%)') % (total_dept, record.potential_dept_available))
-            if total_role > record.potential_role_available:
+            if float_compare(total_role, record.potential_role_available, precision_digits=2) > 0:
                 raise ValidationError(_('Total role weightage (%.2f%%) cannot exceed available weightage (%.2f%%)') % (total_role, record.potential_role_available))
-            if total_common > record.potential_common_available:
+            if float_compare(total_common, record.potential_common_available, precision_digits=2) > 0:
                 raise ValidationError(_('Total common weightage (%.2f%%) cannot exceed available weightage (%.2f%%)') % (total_common, record.potential_common_available))
 
     @api.model
     def create(self, vals):
+        if 'active' in vals and not vals['active']:
+            vals = dict(vals, archived_date=fields.Datetime.now())
         record = super().create(vals)
         record._ensure_common_weightage_distribution()
         record._compute_allocated_to_teams()
         return record
 
     def write(self, vals):
+        self._lock_templates()
+        archiving = self.browse()
+        if 'active' in vals:
+            if vals['active']:
+                vals = dict(vals, archived_date=False)
+            else:
+                archiving = self.filtered('active')
         res = super().write(vals)
+        if archiving:
+            archiving.write({'archived_date': fields.Datetime.now()})
         if any(f in vals for f in ['common_weightage', 'performance_weightage_ids', 'potential_weightage_ids']):
             self._ensure_common_weightage_distribution()
             self._compute_allocated_to_teams()
+        if vals.get('active'):
+            # Unarchived templates get their compacted rows back
+            self.filtered('is_compacted').snapshot_ids.action_restore()
         return res
 
     def _redistribute_common_weightage(self):
         """Redistribute common weightage equally among teams."""
+        self._lock_templates()
         for record in self:
             # For Performance
             perf_teams = record.performance_weightage_ids
@@ -583,9 +759,388 @@ class OHAppraisalNineboxTemplate(models.Model):
             if abs(pot_common_total - record.common_weightage) > 0.01:
                 record._ensure_common_weightage_distribution()
 
+    @api.model
+    def simulate_weightage_changes(self, template_ids=None, split_changes=None, master_changes=None):
+        """Preview the effect of split and master weightage changes without writing anything.
+
+        The weightage rows and criteria lines of all templates are loaded once with
+        grouped queries, the proposed changes are applied in memory and the same
+        rules as the constraints are evaluated on the result.
+
+        :param template_ids: templates to simulate, all active templates when empty
+        :param split_changes: ``{template_id: {'performance_split': x, 'potential_split': y}}``
+        :param master_changes: ``{department_weightage_id: {'functional_weightage': x,
+            'role_weightage': y, 'common_weightage': z}}``
+        :return: one dict per template with the simulated totals and violations
+        """
+        templates = self.browse(template_ids) if template_ids else self.search([('active', '=', True)])
+        if not templates:
+            return []
+        # keys arrive as strings over JSON-RPC
+        split_changes = {int(k): v for k, v in (split_changes or {}).items()}
+        master_changes = {int(k): v for k, v in (master_changes or {}).items()}
+
+        template_data = templates.read([
+            'name', 'department_id', 'industry_type', 'performance_split', 'potential_split',
+            'dept_weightage', 'role_weightage', 'common_weightage',
+        ], load=None)
+
+        # Master configs, resolved like _compute_weightage_distribution. Only needed
+        # to find the templates affected by master_changes: the others keep their
+        # stored weightages, which may come from an OKR sync rather than the master.
+        config_by_dept = {}
+        config_by_dept_industry = {}
+        if master_changes:
+            dept_ids = list({data['department_id'] for data in template_data if data['department_id']})
+            configs = self.env['oh.appraisal.department.weightage'].search_read([
+                ('department_id', 'in', dept_ids),
+                ('active', '=', True),
+            ], ['department_id', 'industry_type'], load=None)
+            for config in configs:
+                config_by_dept.setdefault(config['department_id'], config['id'])
+                config_by_dept_industry.setdefault((config['department_id'], config['industry_type']), config['id'])
+
+        # Weightage rows: team count and allocated sums per template and axis
+        rows = {}
+        for template, row_type, count, dept_sum, role_sum, common_sum in self.env['oh.appraisal.ninebox.weightage']._read_group(
+            [('template_id', 'in', templates.ids)],
+            ['template_id', 'type'],
+            ['__count', 'department_weightage:sum', 'role_weightage:sum', 'common_weightage:sum'],
+        ):
+            rows[template.id, row_type] = (count, dept_sum, role_sum, common_sum)
+
+        # Criteria lines: distributed sums per template, axis and category
+        distributed = {}
+        for axis in ('performance', 'potential'):
+            for template, category, total in self.env['oh.appraisal.ninebox.%s.line' % axis]._read_group(
+                [('template_id', 'in', templates.ids)],
+                ['template_id', 'category'],
+                ['distributed_weightage:sum'],
+            ):
+                distributed[template.id, axis, category] = total
+
+        results = []
+        for data in template_data:
+            template_id = data['id']
+            data.update(split_changes.get(template_id, {}))
+            config_id = False
+            if master_changes and data['department_id']:
+                if data['industry_type']:
+                    config_id = config_by_dept_industry.get((data['department_id'], data['industry_type']))
+                config_id = config_id or config_by_dept.get(data['department_id'])
+            master_change = master_changes.get(config_id, {})
+            dept_weightage = master_change.get('functional_weightage', data['dept_weightage'])
+            role_weightage = master_change.get('role_weightage', data['role_weightage'])
+            common_weightage = master_change.get('common_weightage', data['common_weightage'])
+
+            violations = []
+            performance_split = data['performance_split'] or 0.0
+            potential_split = data['potential_split'] or 0.0
+            if dept_weightage:
+                if performance_split + potential_split > dept_weightage:
+                    violations.append(_(
+                        'Total of Performance (%s%%) and Potential (%s%%) splits cannot exceed '
+                        'the available Department weightage (%s%%)'
+                    ) % (performance_split, potential_split, dept_weightage))
+                if performance_split < 0 or potential_split < 0:
+                    violations.append(_('Split percentages cannot be negative'))
+
+            result = {
+                'template_id': template_id,
+                'name': data['name'],
+                'dept_weightage': dept_weightage,
+                'role_weightage': role_weightage,
+                'common_weightage': common_weightage,
+                'performance_split': performance_split,
+                'potential_split': potential_split,
+            }
+            for axis in ('performance', 'potential'):
+                count, dept_sum, role_sum, common_sum = rows.get((template_id, axis), (0, 0.0, 0.0, 0.0))
+                if 'common_weightage' in master_change:
+                    # Same per-team rounding as _compute_common_weightage
+                    common_sum = round(common_weightage / count, 2) * count if count and common_weightage else 0.0
+                available = {'department': dept_sum, 'role': role_sum, 'common': common_sum}
+                totals = {}
+                for category in ('department', 'role', 'common'):
+                    total = distributed.get((template_id, axis, category), 0.0)
+                    totals[category] = {
+                        'available': available[category],
+                        'allocated': available[category],
+                        'distributed': total,
+                    }
+                    if float_compare(total, available[category], precision_digits=2) > 0:
+                        violations.append(_(
+                            '%s: total %s weightage (%.2f%%) cannot exceed available weightage (%.2f%%)'
+                        ) % (axis.capitalize(), category, total, available[category]))
+                result[axis] = totals
+            result['violations'] = violations
+            results.append(result)
+        return results
+
+    @api.model
+    def _cron_compact_archived_templates(self):
+        """Compact templates archived for longer than the configured retention period"""
+        retention_days = int(self.env['ir.config_parameter'].sudo().get_param(
+            'oh_appraisal_ninebox.retention_days', 365))
+        if retention_days <= 0:
+            return
+        templates = self.with_context(active_test=False).search([
+            ('active', '=', False),
+            ('is_compacted', '=', False),
+            ('archived_date', '<', fields.Datetime.subtract(fields.Datetime.now(), days=retention_days)),
+        ], limit=NINEBOX_COMPACT_BATCH)
+        templates._compact()
+
+    def action_compact(self):
+        if self.filtered('active'):
+            raise UserError(_('Only archived templates can be compacted.'))
+        self._compact()
+
+    def _compact(self):
+        """Move the rows and chatter of archived templates into frozen snapshots"""
+        templates = self.filtered(lambda t: not t.active and not t.is_compacted)
+        if not templates:
+            return
+        templates._lock_templates()
+        payloads = {
+            template_id: {
+                'weightages': [], 'performance_lines': [], 'potential_lines': [],
+                'messages': [], 'activities': [], 'followers': [],
+            }
+            for template_id in templates.ids
+        }
+        # One read per table for the whole batch
+        for key, model, fields_list in [
+            ('weightages', 'oh.appraisal.ninebox.weightage', NINEBOX_WEIGHTAGE_SNAPSHOT_FIELDS),
+            ('performance_lines', 'oh.appraisal.ninebox.performance.line', NINEBOX_LINE_SNAPSHOT_FIELDS),
+            ('potential_lines', 'oh.appraisal.ninebox.potential.line', NINEBOX_LINE_SNAPSHOT_FIELDS),
+        ]:
+            rows = self.env[model].search([('template_id', 'in', templates.ids)])
+            for row in rows.read(fields_list + ['template_id'], load=None):
+                del row['id']
+                payloads[row.pop('template_id')][key].append(row)
+
+        messages = self.env['mail.message'].sudo().search([
+            ('model', '=', self._name),
+            ('res_id', 'in', templates.ids),
+        ], order='id')
+        tracking_by_message = {}
+        for tracking in messages.tracking_value_ids.read(NINEBOX_TRACKING_SNAPSHOT_FIELDS + ['mail_message_id'], load=None):
+            del tracking['id']
+            tracking_by_message.setdefault(tracking.pop('mail_message_id'), []).append(tracking)
+        # The old message id is kept to rebuild the parent_id threading on restore.
+        # Attachments stay in ir_attachment (res_model is the template) and are
+        # only relinked.
+        for message in messages.read(NINEBOX_MESSAGE_SNAPSHOT_FIELDS + ['res_id'], load=None):
+            message['tracking_values'] = tracking_by_message.get(message['id'], [])
+            payloads[message.pop('res_id')]['messages'].append(message)
+
+        activities = self.env['mail.activity'].sudo().search([
+            ('res_model', '=', self._name),
+            ('res_id', 'in', templates.ids),
+        ])
+        for activity in activities.read(NINEBOX_ACTIVITY_SNAPSHOT_FIELDS + ['res_id'], load=None):
+            del activity['id']
+            payloads[activity.pop('res_id')]['activities'].append(activity)
+
+        followers = self.env['mail.followers'].sudo().search([
+            ('res_model', '=', self._name),
+            ('res_id', 'in', templates.ids),
+        ])
+        for follower in followers.read(NINEBOX_FOLLOWER_SNAPSHOT_FIELDS + ['res_id'], load=None):
+            del follower['id']
+            payloads[follower.pop('res_id')]['followers'].append(follower)
+
+        snapshot_vals_list = [
+            self.env['oh.appraisal.ninebox.snapshot']._prepare_snapshot_vals(template, payloads[template.id])
+            for template in templates
+        ]
+        self.env['oh.appraisal.ninebox.snapshot'].create(snapshot_vals_list)
+        # Keep the past cycles in the movement analysis once the lines are gone
+        self.env['oh.appraisal.ninebox.team.score']._store_template_scores(templates)
+
+        for model in ['oh.appraisal.ninebox.weightage',
+                      'oh.appraisal.ninebox.performance.line',
+                      'oh.appraisal.ninebox.potential.line']:
+            self.env[model].search([('template_id', 'in', templates.ids)]).unlink()
+        # Tracking values are removed along with their messages
+        messages.unlink()
+        activities.unlink()
+        followers.unlink()
+        templates.write({'is_compacted': True})
+
+    def _restore_snapshot(self, payload):
+        """Recreate the rows and chatter of this template from a snapshot payload"""
+        self.ensure_one()
+        self._lock_templates()
+        is_synced = self.is_synced
+        # Weightage rows cannot be created on a synced template
+        self.is_synced = False
+        self.env['oh.appraisal.ninebox.weightage'].create([
+            dict(vals, template_id=self.id) for vals in payload['weightages']
+        ])
+        self.env['oh.appraisal.ninebox.performance.line'].create([
+            dict(vals, template_id=self.id) for vals in payload['performance_lines']
+        ])
+        self.env['oh.appraisal.ninebox.potential.line'].create([
+            dict(vals, template_id=self.id) for vals in payload['potential_lines']
+        ])
+        existing_attachments = set(self.env['ir.attachment'].sudo().browse([
+            attachment_id for message in payload['messages'] for attachment_id in message.get('attachment_ids', [])
+        ]).exists().ids)
+        # Messages were stored in id order, so a parent is always restored before its replies
+        new_message_ids = {}
+        Message = self.env['mail.message'].sudo()
+        for message in payload['messages']:
+            vals = {
+                key: value for key, value in message.items()
+                if key not in ('id', 'tracking_values', 'parent_id', 'partner_ids', 'attachment_ids')
+            }
+            vals.update(
+                model=self._name,
+                res_id=self.id,
+                parent_id=new_message_ids.get(message.get('parent_id'), False),
+                partner_ids=[(6, 0, message.get('partner_ids', []))],
+                attachment_ids=[(6, 0, [
+                    attachment_id for attachment_id in message.get('attachment_ids', [])
+                    if attachment_id in existing_attachments
+                ])],
+                tracking_value_ids=[(0, 0, tracking) for tracking in message['tracking_values']],
+            )
+            new_message_ids[message.get('id')] = Message.create(vals).id
+        res_model_id = self.env['ir.model']._get_id(self._name)
+        self.env['mail.activity'].sudo().create([
+            dict(activity, res_model_id=res_model_id, res_id=self.id)
+            for activity in payload.get('activities', [])
+        ])
+        # Skip partners deleted since the compaction or already following again
+        follower_partners = self.env['res.partner'].sudo().browse(
+            [follower['partner_id'] for follower in payload.get('followers', [])]
+        ).exists() - self.sudo().message_partner_ids
+        self.env['mail.followers'].sudo().create([
+            dict(follower, res_model=self._name, res_id=self.id, subtype_ids=[(6, 0, follower['subtype_ids'])])
+            for follower in payload.get('followers', [])
+            if follower['partner_id'] in follower_partners.ids
+        ])
+        self.env['oh.appraisal.ninebox.team.score'].search([('template_id', '=', self.id)]).unlink()
+        vals = {'is_synced': is_synced, 'is_compacted': False}
+        if not self.active:
+            # Restored on demand while still archived: restart the retention
+            # period so the next cron run does not compact it right away
+            vals['archived_date'] = fields.Datetime.now()
+        self.write(vals)
+
+    def action_auto_distribute_weightage(self):
+        """Fill the available weightage of every criteria table from the line priorities"""
+        self._auto_distribute_weightage()
+        synced = len(self.filtered('is_synced'))
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _('Success'),
+                'message': _('Weightage distributed on %(done)s template(s). Performance tables of '
+                             '%(synced)s synced template(s) were left as synced.',
+                             done=len(self), synced=synced),
+                'type': 'success',
+                'sticky': False,
+                'next': {
+                    'type': 'ir.actions.client',
+                    'tag': 'reload',
+                }
+            }
+        }
+
+    def _auto_distribute_weightage(self):
+        """Split each ``*_available`` budget over its criteria lines by priority.
+
+        Budgets and lines of all templates are read with one query per table and
+        the amounts are split in hundredths of a percent, so every table adds up
+        exactly to its available weightage. Each line table is then updated with
+        a single statement.
+        """
+        if not self:
+            return
+        # The lines are written with SQL below, check what the ORM would have checked
+        self.check_access('write')
+        self._lock_templates()
+        Weightage = self.env['oh.appraisal.ninebox.weightage']
+        for model in ['oh.appraisal.ninebox.weightage',
+                      'oh.appraisal.ninebox.performance.line',
+                      'oh.appraisal.ninebox.potential.line']:
+            self.env[model].flush_model()
+
+        available = {}
+        for template, row_type, dept_sum, role_sum, common_sum in Weightage._read_group(
+            [('template_id', 'in', self.ids)],
+            ['template_id', 'type'],
+            ['department_weightage:sum', 'role_weightage:sum', 'common_weightage:sum'],
+        ):
+            available[template.id, row_type, 'department'] = dept_sum
+            available[template.id, row_type, 'role'] = role_sum
+            available[template.id, row_type, 'common'] = common_sum
+
+        for axis in ('performance', 'potential'):
+            Line = self.env['oh.appraisal.ninebox.%s.line' % axis]
+            lines_by_table = {}
+            # Performance tables of synced templates come from the OKR template
+            templates = self.filtered(lambda t: not t.is_synced) if axis == 'performance' else self
+            lines = Line.search([('template_id', 'in', templates.ids)], order='template_id, sequence, id')
+            lines.check_access('write')
+            for line in lines.read(['template_id', 'category', 'priority'], load=None):
+                lines_by_table.setdefault((line['template_id'], axis, line['category']), []).append(line)
+
+            line_ids = []
+            values = []
+            for key, lines in lines_by_table.items():
+                budget = round(available.get(key, 0.0) * 100)
+                weights = [NINEBOX_PRIORITY_WEIGHTS.get(line['priority'], NINEBOX_PRIORITY_WEIGHTS['medium'])
+                           for line in lines]
+                for line, share in zip(lines, _split_by_weights(budget, weights)):
+                    line_ids.append(line['id'])
+                    values.append(share / 100.0)
+            if not line_ids:
+                continue
+
+            self.env.cr.execute("""
+                UPDATE %s AS line
+                   SET distributed_weightage = new.value,
+                       write_uid = %%s,
+                       write_date = (now() at time zone 'UTC')
+                  FROM unnest(%%s::int[], %%s::float8[]) AS new(id, value)
+                 WHERE line.id = new.id
+            """ % Line._table, (self.env.uid, line_ids, values))
+            Line.invalidate_model(['distributed_weightage', 'write_uid', 'write_date'])
+        self.invalidate_recordset()
+
+
+class OHAppraisalNineboxTemplateLockMixin(models.AbstractModel):
+    _name = 'oh.appraisal.ninebox.template.lock.mixin'
+    _description = '9-Box Template Child Row Locking'
+
+    def _lock_parent_templates(self, vals_list=()):
+        """Take the advisory locks of the templates these rows belong to"""
+        template_ids = set(self.template_id.ids)
+        template_ids.update(vals['template_id'] for vals in vals_list if vals.get('template_id'))
+        self.env['oh.appraisal.ninebox.template'].browse(template_ids)._lock_templates()
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        self._lock_parent_templates(vals_list)
+        return super().create(vals_list)
+
+    def write(self, vals):
+        self._lock_parent_templates([vals])
+        return super().write(vals)
+
+    def unlink(self):
+        self._lock_parent_templates()
+        return super().unlink()
+
 
 class OHAppraisalNineboxPerformanceLine(models.Model):
     _name = 'oh.appraisal.ninebox.performance.line'
+    _inherit = ['oh.appraisal.ninebox.template.lock.mixin']
     _description = '9-Box Performance Line'
     _order = 'sequence, id'
 
@@ -597,7 +1152,7 @@ class OHAppraisalNineboxPerformanceLine(models.Model):
         ('common', 'Common')
     ], required=True)
     
-    objective_breakdown = fields.Char('Objective Breakdown', required=True)
+    objective_breakdown = fields.Char('Objective Breakdown', required=True, index='trigram')
     priority = fields.Selection([
         ('low', 'Low'),
         ('medium', 'Medium'),
@@ -641,6 +1196,7 @@ class OHAppraisalNineboxPerformanceLine(models.Model):
 
 class OHAppraisalNineboxPotentialLine(models.Model):
     _name = 'oh.appraisal.ninebox.potential.line'
+    _inherit = ['oh.appraisal.ninebox.template.lock.mixin']
     _description = '9-Box Potential Line'
     _order = 'sequence, id'
 
@@ -652,7 +1208,7 @@ class OHAppraisalNineboxPotentialLine(models.Model):
         ('common', 'Common')
     ], required=True)
     
-    objective_breakdown = fields.Char('Objective Breakdown', required=True)
+    objective_breakdown = fields.Char('Objective Breakdown', required=True, index='trigram')
     priority = fields.Selection([
         ('low', 'Low'),
         ('medium', 'Medium'),
@@ -696,6 +1252,7 @@ class OHAppraisalNineboxPotentialLine(models.Model):
 
 class OHAppraisalNineboxWeightage(models.Model):
     _name = 'oh.appraisal.ninebox.weightage'
+    _inherit = ['oh.appraisal.ninebox.template.lock.mixin']
     _description = 'Nine Box Weightage Distribution'
     _order = 'sequence, id'
 
@@ -734,10 +1291,6 @@ class OHAppraisalNineboxWeightage(models.Model):
             else:
                 record.common_weightage = 0.0
 
-    @api.model
-    def create(self, vals):
-        return super().create(vals)
-
     @api.constrains('department_weightage', 'role_weightage')
     def _check_edit_when_synced(self):
         for record in self:
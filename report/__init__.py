@@ -0,0 +1 @@
+from . import ninebox_movement_report
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+from odoo import api, fields, models, tools
+
+# Score (%) from which a team is placed in the medium / high level of an axis
+NINEBOX_MEDIUM_LEVEL_SCORE = 50.0
+NINEBOX_HIGH_LEVEL_SCORE = 80.0
+
+NINEBOX_BOXES = [
+    ('1', '1 - Talent Risk'),
+    ('2', '2 - Average Performer'),
+    ('3', '3 - Solid Performer'),
+    ('4', '4 - Inconsistent Player'),
+    ('5', '5 - Core Player'),
+    ('6', '6 - High Performer'),
+    ('7', '7 - Rough Diamond'),
+    ('8', '8 - Future Star'),
+    ('9', '9 - Star'),
+]
+
+
+class OHAppraisalNineboxTeamScore(models.Model):
+    _name = 'oh.appraisal.ninebox.team.score'
+    _description = '9-Box Compacted Team Score'
+
+    template_id = fields.Many2one(
+        'oh.appraisal.ninebox.template',
+        string='Template',
+        required=True,
+        index=True,
+        ondelete='cascade'
+    )
+    team_id = fields.Many2one('oh.appraisal.team', string='Team')
+    performance_score = fields.Float('Performance Score (%)')
+    potential_score = fields.Float('Potential Score (%)')
+
+    @api.model
+    def _live_score_query(self, where=''):
+        # Achievement of a line is actual / target capped to [0, 1]; the score of a
+        # team on an axis is the weightage-weighted achievement of its lines, or
+        # the plain average when no weightage is distributed.
+        return """
+            WITH line_achievement AS (
+                SELECT template_id, team_id, 'performance' AS axis, distributed_weightage AS weight,
+                       LEAST(GREATEST(actual_value / NULLIF(target_value, 0), 0), 1) AS achievement
+                  FROM oh_appraisal_ninebox_performance_line
+                 %(where)s
+                 UNION ALL
+                SELECT template_id, team_id, 'potential' AS axis, distributed_weightage AS weight,
+                       LEAST(GREATEST(actual_value / NULLIF(target_value, 0), 0), 1) AS achievement
+                  FROM oh_appraisal_ninebox_potential_line
+                 %(where)s
+            )
+            SELECT template_id, team_id,
+                   100 * COALESCE(
+                       SUM(weight * achievement) FILTER (WHERE axis = 'performance')
+                           / NULLIF(SUM(weight) FILTER (WHERE axis = 'performance' AND achievement IS NOT NULL), 0),
+                       AVG(achievement) FILTER (WHERE axis = 'performance'),
+                       0) AS performance_score,
+                   100 * COALESCE(
+                       SUM(weight * achievement) FILTER (WHERE axis = 'potential')
+                           / NULLIF(SUM(weight) FILTER (WHERE axis = 'potential' AND achievement IS NOT NULL), 0),
+                       AVG(achievement) FILTER (WHERE axis = 'potential'),
+                       0) AS potential_score
+              FROM line_achievement
+             GROUP BY template_id, team_id
+        """ % {'where': where}
+
+    @api.model
+    def _store_template_scores(self, templates):
+        """Keep the team scores of templates whose lines are about to be compacted"""
+        self.env['oh.appraisal.ninebox.performance.line'].flush_model()
+        self.env['oh.appraisal.ninebox.potential.line'].flush_model()
+        self.env.cr.execute("""
+            INSERT INTO oh_appraisal_ninebox_team_score
+                   (template_id, team_id, performance_score, potential_score,
+                    create_uid, create_date, write_uid, write_date)
+            SELECT score.template_id, score.team_id, score.performance_score, score.potential_score,
+                   %%(uid)s, now() at time zone 'UTC', %%(uid)s, now() at time zone 'UTC'
+              FROM (%s) score
+        """ % self._live_score_query('WHERE template_id IN %(template_ids)s'),
+            {'uid': self.env.uid, 'template_ids': tuple(templates.ids)})
+        self.invalidate_model()
+
+
+class OHAppraisalNineboxMovementReport(models.Model):
+    _name = 'oh.appraisal.ninebox.movement.report'
+    _description = '9-Box Movement Analysis'
+    _auto = False
+    _order = 'department_id, team_id, period_date'
+
+    template_id = fields.Many2one('oh.appraisal.ninebox.template', string='Template', readonly=True)
+    previous_template_id = fields.Many2one('oh.appraisal.ninebox.template', string='Previous Template', readonly=True)
+    department_id = fields.Many2one('hr.department', string='Department', readonly=True)
+    company_id = fields.Many2one('res.company', string='Company', readonly=True)
+    team_id = fields.Many2one('oh.appraisal.team', string='Team', readonly=True)
+    period_date = fields.Date('Period', readonly=True)
+    period_sequence = fields.Integer('Cycle', readonly=True, aggregator='max')
+
+    performance_score = fields.Float('Performance Score (%)', readonly=True, aggregator='avg')
+    potential_score = fields.Float('Potential Score (%)', readonly=True, aggregator='avg')
+    performance_level = fields.Integer('Performance Level', readonly=True, aggregator='avg')
+    potential_level = fields.Integer('Potential Level', readonly=True, aggregator='avg')
+    box = fields.Selection(NINEBOX_BOXES, string='Box', readonly=True)
+    previous_box = fields.Selection(NINEBOX_BOXES, string='Previous Box', readonly=True)
+
+    performance_delta = fields.Float('Performance Trend (%)', readonly=True, aggregator='avg')
+    potential_delta = fields.Float('Potential Trend (%)', readonly=True, aggregator='avg')
+    movement = fields.Selection([
+        ('new', 'First Cycle'),
+        ('stable', 'Stable'),
+        ('up', 'Moved Up'),
+        ('down', 'Moved Down'),
+        ('lateral', 'Lateral'),
+    ], string='Movement', readonly=True)
+
+    def _query(self):
+        # Compacted templates have no lines left, their scores were kept in
+        # oh_appraisal_ninebox_team_score when they were compacted.
+        return """
+            WITH live_team_score AS (%(live)s),
+            team_score AS (
+                SELECT template_id, team_id, performance_score, potential_score
+                  FROM live_team_score
+                 UNION ALL
+                SELECT template_id, team_id, performance_score, potential_score
+                  FROM oh_appraisal_ninebox_team_score
+            ),
+            placement AS (
+                SELECT score.*,
+                       template.department_id,
+                       template.company_id,
+                       template.period_start AS period_date,
+                       CASE WHEN score.performance_score >= %(high)s THEN 3
+                            WHEN score.performance_score >= %(medium)s THEN 2
+                            ELSE 1 END AS performance_level,
+                       CASE WHEN score.potential_score >= %(high)s THEN 3
+                            WHEN score.potential_score >= %(medium)s THEN 2
+                            ELSE 1 END AS potential_level
+                  FROM team_score score
+                  JOIN oh_appraisal_ninebox_template template ON template.id = score.template_id
+            ),
+            transition AS (
+                SELECT placement.*,
+                       ROW_NUMBER() OVER cycle AS period_sequence,
+                       LAG(template_id) OVER cycle AS previous_template_id,
+                       LAG(performance_level) OVER cycle AS previous_performance_level,
+                       LAG(potential_level) OVER cycle AS previous_potential_level,
+                       performance_score - LAG(performance_score) OVER cycle AS performance_delta,
+                       potential_score - LAG(potential_score) OVER cycle AS potential_delta
+                  FROM placement
+                WINDOW cycle AS (PARTITION BY department_id, team_id ORDER BY period_date, template_id)
+            )
+            SELECT ROW_NUMBER() OVER (ORDER BY template_id, team_id) AS id,
+                   template_id,
+                   previous_template_id,
+                   department_id,
+                   company_id,
+                   team_id,
+                   period_date,
+                   period_sequence,
+                   performance_score,
+                   potential_score,
+                   performance_level,
+                   potential_level,
+                   ((potential_level - 1) * 3 + performance_level)::varchar AS box,
+                   ((previous_potential_level - 1) * 3 + previous_performance_level)::varchar AS previous_box,
+                   performance_delta,
+                   potential_delta,
+                   CASE WHEN previous_template_id IS NULL THEN 'new'
+                        WHEN performance_level = previous_performance_level
+                         AND potential_level = previous_potential_level THEN 'stable'
+                        WHEN performance_level >= previous_performance_level
+                         AND potential_level >= previous_potential_level THEN 'up'
+                        WHEN performance_level <= previous_performance_level
+                         AND potential_level <= previous_potential_level THEN 'down'
+                        ELSE 'lateral' END AS movement
+              FROM transition
+        """ % {
+            'live': self.env['oh.appraisal.ninebox.team.score']._live_score_query(),
+            'medium': NINEBOX_MEDIUM_LEVEL_SCORE,
+            'high': NINEBOX_HIGH_LEVEL_SCORE,
+        }
+
+    def init(self):
+        tools.drop_view_if_exists(self.env.cr, self._table)
+        self.env.cr.execute("""CREATE OR REPLACE VIEW %s AS (%s)""" % (self._table, self._query()))
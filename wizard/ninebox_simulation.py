@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+from odoo import api, fields, models, _
+
+
+class OHAppraisalNineboxSimulation(models.TransientModel):
+    _name = 'oh.appraisal.ninebox.simulation'
+    _description = '9-Box Weightage What-If Simulation'
+
+    template_ids = fields.Many2many(
+        'oh.appraisal.ninebox.template',
+        string='Templates',
+        default=lambda self: self._default_template_ids(),
+        help="Templates to simulate. Leave empty to simulate every active template"
+    )
+
+    # Proposed split changes, applied to every selected template
+    apply_split = fields.Boolean('Change Splits')
+    performance_split = fields.Float('Performance Split (%)')
+    potential_split = fields.Float('Potential Split (%)')
+
+    # Proposed master weightage changes
+    department_weightage_id = fields.Many2one(
+        'oh.appraisal.department.weightage',
+        string='Master Weightage',
+        help="Master department weightage configuration to change"
+    )
+    functional_weightage = fields.Float('Department Weightage (%)')
+    role_weightage = fields.Float('Role Weightage (%)')
+    common_weightage = fields.Float('Common Weightage (%)')
+
+    line_ids = fields.One2many('oh.appraisal.ninebox.simulation.line', 'simulation_id', string='Results')
+    violation_count = fields.Integer('Violations', compute='_compute_violation_count')
+
+    @api.model
+    def _default_template_ids(self):
+        if self.env.context.get('active_model') == 'oh.appraisal.ninebox.template':
+            return self.env.context.get('active_ids', [])
+        return []
+
+    @api.depends('line_ids.violation_count')
+    def _compute_violation_count(self):
+        for record in self:
+            record.violation_count = sum(record.line_ids.mapped('violation_count'))
+
+    @api.onchange('department_weightage_id')
+    def _onchange_department_weightage_id(self):
+        config = self.department_weightage_id
+        self.functional_weightage = config.functional_weightage
+        self.role_weightage = config.role_weightage
+        self.common_weightage = config.common_weightage
+
+    def _get_split_changes(self):
+        if not self.apply_split:
+            return {}
+        templates = self.template_ids or self.env['oh.appraisal.ninebox.template'].search([('active', '=', True)])
+        return {
+            template_id: {
+                'performance_split': self.performance_split,
+                'potential_split': self.potential_split,
+            } for template_id in templates.ids
+        }
+
+    def _get_master_changes(self):
+        if not self.department_weightage_id:
+            return {}
+        return {
+            self.department_weightage_id.id: {
+                'functional_weightage': self.functional_weightage,
+                'role_weightage': self.role_weightage,
+                'common_weightage': self.common_weightage,
+            }
+        }
+
+    def action_simulate(self):
+        """Run the simulation in memory and show the resulting totals"""
+        self.ensure_one()
+        results = self.env['oh.appraisal.ninebox.template'].simulate_weightage_changes(
+            template_ids=self.template_ids.ids,
+            split_changes=self._get_split_changes(),
+            master_changes=self._get_master_changes(),
+        )
+
+        line_vals = [(5, 0, 0)]
+        for result in results:
+            performance = result['performance']
+            potential = result['potential']
+            line_vals.append((0, 0, {
+                'template_id': result['template_id'],
+                'dept_weightage': result['dept_weightage'],
+                'common_weightage': result['common_weightage'],
+                'performance_split': result['performance_split'],
+                'potential_split': result['potential_split'],
+                'performance_dept_available': performance['department']['available'],
+                'performance_dept_distributed': performance['department']['distributed'],
+                'performance_role_available': performance['role']['available'],
+                'performance_role_distributed': performance['role']['distributed'],
+                'performance_common_available': performance['common']['available'],
+                'performance_common_distributed': performance['common']['distributed'],
+                'potential_dept_available': potential['department']['available'],
+                'potential_dept_distributed': potential['department']['distributed'],
+                'potential_role_available': potential['role']['available'],
+                'potential_role_distributed': potential['role']['distributed'],
+                'potential_common_available': potential['common']['available'],
+                'potential_common_distributed': potential['common']['distributed'],
+                'violation_count': len(result['violations']),
+                'violations': '\n'.join(result['violations']),
+            }))
+        self.write({'line_ids': line_vals})
+
+        return {
+            'type': 'ir.actions.act_window',
+            'name': _('What-If Simulation'),
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
+
+
+class OHAppraisalNineboxSimulationLine(models.TransientModel):
+    _name = 'oh.appraisal.ninebox.simulation.line'
+    _description = '9-Box Weightage What-If Simulation Result'
+    _order = 'violation_count desc, id'
+
+    simulation_id = fields.Many2one('oh.appraisal.ninebox.simulation', ondelete='cascade')
+    template_id = fields.Many2one('oh.appraisal.ninebox.template', string='Template', readonly=True)
+    dept_weightage = fields.Float('Department Weightage (%)', readonly=True)
+    common_weightage = fields.Float('Common Weightage (%)', readonly=True)
+    performance_split = fields.Float('Performance Split (%)', readonly=True)
+    potential_split = fields.Float('Potential Split (%)', readonly=True)
+
+    performance_dept_available = fields.Float('Performance Dept Available (%)', readonly=True)
+    performance_dept_distributed = fields.Float('Performance Dept Distributed (%)', readonly=True)
+    performance_role_available = fields.Float('Performance Role Available (%)', readonly=True)
+    performance_role_distributed = fields.Float('Performance Role Distributed (%)', readonly=True)
+    performance_common_available = fields.Float('Performance Common Available (%)', readonly=True)
+    performance_common_distributed = fields.Float('Performance Common Distributed (%)', readonly=True)
+
+    potential_dept_available = fields.Float('Potential Dept Available (%)', readonly=True)
+    potential_dept_distributed = fields.Float('Potential Dept Distributed (%)', readonly=True)
+    potential_role_available = fields.Float('Potential Role Available (%)', readonly=True)
+    potential_role_distributed = fields.Float('Potential Role Distributed (%)', readonly=True)
+    potential_common_available = fields.Float('Potential Common Available (%)', readonly=True)
+    potential_common_distributed = fields.Float('Potential Common Distributed (%)', readonly=True)
+
+    violation_count = fields.Integer('Violations', readonly=True)
+    violations = fields.Text('Violation Details', readonly=True)